@@ -1,7 +1,6 @@
 # agent/agent_graph.py
 
 import logging
-import asyncio
 import json
 import re
 from typing import Optional
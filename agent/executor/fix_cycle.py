@@ -54,6 +54,9 @@ class FixCycleTracker:
     def to_state(self) -> Dict[str, Any]:
         return self._state.copy()
 
+    def reset(self) -> None:
+        self._state = FixCycleTracker._get_default_state()
+
     def start_fix_cycle(
         self,
         tool_name: str,
@@ -5,10 +5,12 @@ import uuid
 import json
 import os
 import datetime
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, Final
 from uuid import UUID
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, WebSocket, WebSocketDisconnect
+from langgraph.pregel import Pregel
 from langchain_core.messages import HumanMessage, AIMessage
 import asyncio
 import re
@@ -81,8 +83,26 @@ async def health_check():
     return {"status": "ok"}
 
 
+@lru_cache(maxsize=1)
+def get_agent_graph() -> Pregel:
+    """
+    Returns the agent graph, compiled once per process.
+
+    Each request passes the full conversation in its initial state, and the
+    messages channel appends, so the graph is compiled without a checkpointer:
+    nothing carries over between runs, just as when a fresh graph (with its own
+    MemorySaver) was compiled for every prompt.
+    """
+    return compile_agent_graph(checkpointer=False)
+
+
+# The greeting never changes, so its wire message is serialized once at import.
+INITIAL_GREETING: Final[str] = "Hello, I'm App Agent. Let me know if you'd like to brainstorm your idea, or get straight into building!"
+INITIAL_GREETING_JSON: Final[str] = FinalMessage(d=INITIAL_GREETING).model_dump_json()
+
+
 @app.websocket("/api/agent")
-async def agent_websocket(websocket: WebSocket):
+async def agent_websocket(websocket: WebSocket, agent_graph: Pregel = Depends(get_agent_graph)):
     """
     Handles the WebSocket connection for the agent.
     Accepts user prompts and streams back agent events and PTY logs.
@@ -93,8 +113,7 @@ async def agent_websocket(websocket: WebSocket):
     pty_manager = get_pty_manager()
 
     # Send initial greeting message from the agent
-    initial_greeting = "Hello, I'm App Agent. Let me know if you'd like to brainstorm your idea, or get straight into building!"
-    await websocket.send_text(FinalMessage(d=initial_greeting).model_dump_json())
+    await websocket.send_text(INITIAL_GREETING_JSON)
 
     # --- PTY Task Management ---
     task_start_times: Dict[UUID, datetime.datetime] = {}
@@ -225,9 +244,6 @@ async def agent_websocket(websocket: WebSocket):
                 logger.info(f"Received prompt: '{prompt}' for thread '{thread_id}'")
                 messages.append(HumanMessage(content=prompt))
 
-                # Compile a fresh graph for each session/request
-                agent_graph = compile_agent_graph()
-
                 config = {"configurable": {"thread_id": thread_id}}
                 initial_state = AgentState(
                     messages=messages
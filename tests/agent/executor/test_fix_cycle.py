@@ -178,3 +178,15 @@ def test_get_current_fix_state_summary():
     tracker.record_verification_result(True) # Successful verification resets
     summary_after_success_verify = tracker.get_current_fix_state()
     assert not summary_after_success_verify["is_active"]
+
+def test_reset_restores_default_state():
+    tracker = FixCycleTracker()
+    tracker.start_fix_cycle("tool_to_reset", {"a": 1}, "call_reset_1", "Error", max_attempts=5)
+    tracker.record_fix_attempt(fix_applied_successfully=True)
+    tracker.record_verification_result(succeeded=False)
+
+    tracker.reset()
+
+    assert tracker.to_state() == FixCycleTracker().to_state()
+    assert not tracker.needs_verification()
+    assert tracker.get_tool_to_verify() is None
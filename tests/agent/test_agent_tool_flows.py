@@ -1,26 +1,93 @@
 # tests/agent/test_agent_tool_flows.py
+import asyncio
+from typing import Callable, NamedTuple
+
 import pytest
 from unittest.mock import MagicMock, patch
 
 from langchain_core.messages import AIMessage, HumanMessage, ToolCall, ToolMessage
+from langgraph.pregel import Pregel
 
+from agent.executor.fix_cycle import FixCycleTracker
 from agent.state import AgentState
 
 # Ensure all tools are loaded for potential mocking/inspection if needed by name
 # (No need to import build_agent_graph or ALL_TOOLS_LIST at module level)
 
-@pytest.mark.asyncio
-@patch('agent.agent_graph.planner_reason_step', new_callable=MagicMock)
-@patch('agent.agent_graph.tool_executor_step', new_callable=MagicMock)
-async def test_initial_create_app_flow_uses_run_shell(mock_tool_executor_step, mock_planner_reason_step, fix_cycle_tracker):
-    # Add a print side effect to the executor mock
+
+# --- Message Helpers ---
+
+# The messages below are known-good fixtures, so we build them with
+# model_construct() and skip pydantic validation on every instantiation.
+# Only `content` (and `tool_call_id` for ToolMessage) are required fields;
+# everything else falls back to the model defaults.
+
+def ai(content: str, tool_calls: list | None = None) -> AIMessage:
+    return AIMessage.model_construct(content=content, tool_calls=tool_calls or [])
+
+
+def tool_msg(content: str, tool_call_id: str) -> ToolMessage:
+    return ToolMessage.model_construct(content=content, tool_call_id=tool_call_id)
+
+
+# --- Scripted Mocks ---
+
+def scripted_planner(plan: list[tuple[str, ToolCall | None]]) -> list[dict]:
+    """
+    Turns a plan of (ai_content, tool_call_or_None) steps into the side_effect
+    list for a mocked planner_reason_step, one planner output per step.
+    """
+    return [
+        {"messages": [ai(content, [tool_call] if tool_call else None)]}
+        for content, tool_call in plan
+    ]
+
+
+def scripted_executor(outputs: dict[str, str], fix_cycle_tracker) -> Callable[..., dict]:
+    """
+    Returns a side_effect for a mocked tool_executor_step that answers each
+    tool call with the ToolMessage content registered for its tool_call_id.
+    """
     def executor_side_effect(*args, **kwargs):
         print("MOCK TOOL EXECUTOR CALLED")
+        tool_call = args[0].messages[-1].tool_calls[0]
+        tool_call_id = tool_call["id"] if isinstance(tool_call, dict) else tool_call.id
         return {
-            "messages": [ToolMessage(content="App created.", tool_call_id="tool_call_123")],
+            "messages": [tool_msg(outputs[tool_call_id], tool_call_id)],
             "fix_cycle_tracker": fix_cycle_tracker
         }
-    mock_tool_executor_step.side_effect = executor_side_effect
+    return executor_side_effect
+
+
+# --- Scenario Helpers ---
+
+class FlowScenario(NamedTuple):
+    """A compiled graph with its own mocks, plus the input and checks for one flow."""
+    name: str
+    graph: Pregel
+    initial_state: AgentState
+    config: dict
+    check: Callable[[dict], None]
+
+
+def _compile_with_mocks(mock_planner_reason_step: MagicMock, mock_tool_executor_step: MagicMock) -> Pregel:
+    """
+    Builds and compiles the agent graph with the given planner/executor mocks.
+
+    The graph captures the node functions when it is built, so the patches only
+    need to be active during the build. This lets several scenarios, each with
+    their own mocks, run on the same event loop at once.
+    """
+    from agent.agent_graph import build_agent_graph
+    with patch('agent.agent_graph.planner_reason_step', mock_planner_reason_step), \
+         patch('agent.agent_graph.tool_executor_step', mock_tool_executor_step):
+        return build_agent_graph().compile()
+
+
+def _initial_create_app_flow_uses_run_shell(fix_cycle_tracker) -> FlowScenario:
+    mock_planner_reason_step = MagicMock()
+    mock_tool_executor_step = MagicMock()
+
     # 1. Setup Mocks
     tool_call_id = "tool_call_123"
     tool_call = ToolCall(
@@ -28,84 +95,99 @@ async def test_initial_create_app_flow_uses_run_shell(mock_tool_executor_step, m
         args={"command": "npx create-next-app@latest my-app"},
         id=tool_call_id
     )
-    mock_planner_reason_step.side_effect = [
-        {"messages": [AIMessage(content="Okay, creating the app.", tool_calls=[tool_call])]},
-        {"messages": [AIMessage(content="App created successfully.")]}
-    ]
-
-    # 2. Build the graph after patching
-    from agent.agent_graph import build_agent_graph
-    graph = build_agent_graph().compile()
+    mock_tool_executor_step.side_effect = scripted_executor({tool_call_id: "App created."}, fix_cycle_tracker)
+    mock_planner_reason_step.side_effect = scripted_planner([
+        ("Okay, creating the app.", tool_call),
+        ("App created successfully.", None),
+    ])
 
-    # 3. Define Inputs and run agent
+    # 2. Define Inputs
     initial_state = AgentState(messages=[HumanMessage(content="Create a new Next.js app called my-app")])
     config = {"configurable": {"thread_id": "test-create-app"}}
-    final_state = await graph.ainvoke(initial_state, config)
 
-    # 4. Assertions
-    assert mock_planner_reason_step.call_count == 2
-    mock_tool_executor_step.assert_called_once()
+    # 3. Assertions
+    def check(final_state: dict) -> None:
+        assert mock_planner_reason_step.call_count == 2
+        mock_tool_executor_step.assert_called_once()
+
+        # Check the state passed to the tool executor
+        call_args, _ = mock_tool_executor_step.call_args
+        state_arg = call_args[0]  # Get the state object from mock args
+        last_message = state_arg.messages[-1]
+        tool_call = last_message.tool_calls[0]
+        if isinstance(tool_call, dict):
+            assert tool_call["name"] == "run_shell"
+        else:
+            assert tool_call.name == "run_shell"
 
-    # Check the state passed to the tool executor
-    call_args, _ = mock_tool_executor_step.call_args
-    state_arg = call_args[0]  # Get the state object from mock args
-    last_message = state_arg.messages[-1]
-    tool_call = last_message.tool_calls[0]
-    if isinstance(tool_call, dict):
-        assert tool_call["name"] == "run_shell"
-    else:
-        assert tool_call.name == "run_shell"
+        # Check the final message
+        assert final_state['messages'][-1].content == "App created successfully."
 
-    # Check the final message
-    assert final_state['messages'][-1].content == "App created successfully."
+    graph = _compile_with_mocks(mock_planner_reason_step, mock_tool_executor_step)
+    return FlowScenario("initial_create_app_flow_uses_run_shell", graph, initial_state, config, check)
 
 
-@pytest.mark.asyncio
-@patch('agent.agent_graph.planner_reason_step', new_callable=MagicMock)
-@patch('agent.agent_graph.tool_executor_step', new_callable=MagicMock)
-async def test_multi_step_flow(mock_tool_executor_step, mock_planner_reason_step, fix_cycle_tracker):
-    # Add a print side effect to the executor mock
-    def executor_side_effect(*args, **kwargs):
-        print("MOCK TOOL EXECUTOR CALLED")
-        # Determine which tool_call_id to use based on the input
-        tool_call = args[0].messages[-1].tool_calls[0]
-        tool_call_id = tool_call["id"] if isinstance(tool_call, dict) else tool_call.id
-        if tool_call_id == "read_call_456":
-            return {
-                "messages": [ToolMessage(content="content from a", tool_call_id="read_call_456")],
-                "fix_cycle_tracker": fix_cycle_tracker
-            }
-        else:
-            return {
-                "messages": [ToolMessage(content="File written.", tool_call_id="write_call_789")],
-                "fix_cycle_tracker": fix_cycle_tracker
-            }
-    mock_tool_executor_step.side_effect = executor_side_effect
+def _multi_step_flow(fix_cycle_tracker) -> FlowScenario:
+    mock_planner_reason_step = MagicMock()
+    mock_tool_executor_step = MagicMock()
+
     # 1. Setup Mocks
     read_tool_call_id = "read_call_456"
     write_tool_call_id = "write_call_789"
     read_tool_call = ToolCall(name="read_file", args={"path_in_repo": "a.txt"}, id=read_tool_call_id)
     write_tool_call = ToolCall(name="write_file", args={"path_in_repo": "b.txt", "content": "content from a"}, id=write_tool_call_id)
 
+    mock_tool_executor_step.side_effect = scripted_executor(
+        {read_tool_call_id: "content from a", write_tool_call_id: "File written."},
+        fix_cycle_tracker,
+    )
     # Mock the planner to first call read_file, then write_file, then finish.
-    mock_planner_reason_step.side_effect = [
-        {"messages": [AIMessage(content="I'll read a.txt", tool_calls=[read_tool_call])]},
-        {"messages": [AIMessage(content="I'll write to b.txt", tool_calls=[write_tool_call])]},
-        {"messages": [AIMessage(content="All done.")]}
-    ]
-
-    # 2. Build the graph after patching
-    from agent.agent_graph import build_agent_graph
-    graph = build_agent_graph().compile()
+    mock_planner_reason_step.side_effect = scripted_planner([
+        ("I'll read a.txt", read_tool_call),
+        ("I'll write to b.txt", write_tool_call),
+        ("All done.", None),
+    ])
 
-    # 3. Define Inputs and run agent
+    # 2. Define Inputs
     initial_state = AgentState(messages=[HumanMessage(content="Read a.txt and write its content to b.txt")])
     config = {"configurable": {"thread_id": "test-multi-step"}}
-    final_state = await graph.ainvoke(initial_state, config)
 
-    # 4. Assertions
-    assert mock_planner_reason_step.call_count == 3
-    assert mock_tool_executor_step.call_count == 2
+    # 3. Assertions
+    def check(final_state: dict) -> None:
+        assert mock_planner_reason_step.call_count == 3
+        assert mock_tool_executor_step.call_count == 2
+
+        # Check that the final message is correct
+        assert final_state['messages'][-1].content == "All done."
+
+    graph = _compile_with_mocks(mock_planner_reason_step, mock_tool_executor_step)
+    return FlowScenario("multi_step_flow", graph, initial_state, config, check)
+
+
+FLOW_SCENARIOS = [
+    _initial_create_app_flow_uses_run_shell,
+    _multi_step_flow,
+]
+
+
+# --- Tests ---
+
+@pytest.mark.asyncio
+async def test_tool_flows_concurrently():
+    """
+    Runs every flow scenario against its own compiled graph in a single
+    asyncio.gather, so the scenarios overlap instead of running back to back.
+    Each scenario gets its own FixCycleTracker, so overlapping flows never
+    share tracker state.
+    """
+    scenarios = [build(FixCycleTracker()) for build in FLOW_SCENARIOS]
+
+    final_states = await asyncio.gather(
+        *(scenario.graph.ainvoke(scenario.initial_state, scenario.config) for scenario in scenarios)
+    )
 
-    # Check that the final message is correct
-    assert final_state['messages'][-1].content == "All done."
+    for scenario, final_state in zip(scenarios, final_states):
+        try:
+            scenario.check(final_state)
+        except AssertionError as e:
+            raise AssertionError(f"Flow scenario '{scenario.name}' failed: {e}") from e
@@ -2,14 +2,13 @@
 
 import os
 from pathlib import Path
-import importlib
 
 import pytest
 from pydantic import ValidationError
-from langchain_openai import OpenAIEmbeddings
 
 # We need to test the modules, so we import them.
-from common import config, embeddings
+# common.embeddings pulls in langchain_openai, so the embedding tests import it themselves.
+from common import config
 
 def test_settings_load_defaults(monkeypatch):
     """Tests that the Settings class loads with default values."""
@@ -68,6 +67,10 @@ def test_embedding_factory_openai_success(monkeypatch):
     """
     Tests that the embedding factory returns an OpenAIEmbeddings instance correctly.
     """
+    # Imported here so the Settings-only tests don't pay for loading langchain_openai.
+    OpenAIEmbeddings = pytest.importorskip("langchain_openai").OpenAIEmbeddings
+    from common import embeddings
+
     # We patch the 'settings' object specifically where it's imported and used.
     # This is more surgical than reloading the whole module.
     mock_settings = config.Settings(
@@ -88,6 +91,9 @@ def test_embedding_factory_unsupported_provider_fails(monkeypatch):
     """
     Tests that the embedding factory raises a ValueError for an unsupported provider.
     """
+    pytest.importorskip("langchain_openai")
+    from common import embeddings
+
     mock_settings = config.Settings(EMBED_PROVIDER='unsupported_provider', _env_file=None)
     monkeypatch.setattr(embeddings, 'settings', mock_settings)
 
@@ -1,6 +1,9 @@
 # tests/conftest.py
 
 
+import os
+import shutil
+import subprocess
 import sys
 from pathlib import Path
 
@@ -21,6 +24,12 @@ def pytest_addoption(parser):
         default=False,
         help="Enable streaming output for live E2E shell commands.",
     )
+    parser.addoption(
+        "--tmpfs",
+        action="store_true",
+        default=False,
+        help="Root pytest's temp dirs on the /dev/shm tmpfs (Linux, when it has 2 GiB free).",
+    )
     # Add --prompts option only if not already added by a sub-package conftest
     try:
         parser.addoption(
@@ -33,27 +42,54 @@ def pytest_addoption(parser):
         # Option already registered (e.g., by tests/live_e2e/conftest.py). Ignore.
         pass
 
-project_root = Path(__file__).parent.parent.resolve()
-if str(project_root) not in sys.path:
-    sys.path.insert(0, str(project_root))
+PROJECT_ROOT_STR = os.fspath(Path(__file__).resolve().parent.parent)
+if PROJECT_ROOT_STR not in sys.path[:1]:
+    sys.path.insert(0, PROJECT_ROOT_STR)
 
 import pytest
 import pytest_asyncio # Added for async fixtures
 import asyncio
-from typing import AsyncIterator, Optional, List
-from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Optional, List
+from contextlib import AsyncExitStack, asynccontextmanager
+from enum import IntEnum
+from functools import lru_cache
 from unittest.mock import patch
 
 from fastmcp import Client, FastMCP
 from pydantic import BaseModel, Field
 from mcp.shared.exceptions import McpError, ErrorData
 
-# Custom MCP Error Codes (integers)
-RESOURCE_NOT_FOUND_CODE = -32010
-IS_A_DIRECTORY_ERROR_CODE = -32011
-PERMISSION_DENIED_CODE = -32012
-NOT_A_DIRECTORY_CODE = -32013
-GENERIC_TOOL_ERROR_CODE = -32003 # Consistent with other tests
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
+
+# With --tmpfs, pytest's temp dirs are rooted on the /dev/shm tmpfs, which
+# speeds up the integration fixtures that write many small files under tmp_path
+# (git repos, `npm install` trees). Only used on Linux when /dev/shm has room
+# (Docker's default mount is 64 MiB); an explicit PYTEST_DEBUG_TEMPROOT wins.
+_TMPFS_ROOT = "/dev/shm"
+_TMPFS_MIN_FREE_BYTES = 2 << 30
+
+
+def pytest_configure(config):
+    if not config.getoption("--tmpfs"):
+        return
+    if not sys.platform.startswith("linux") or "PYTEST_DEBUG_TEMPROOT" in os.environ:
+        return
+    try:
+        if os.access(_TMPFS_ROOT, os.W_OK) and shutil.disk_usage(_TMPFS_ROOT).free >= _TMPFS_MIN_FREE_BYTES:
+            # TempPathFactory reads this when the first temp dir is created.
+            os.environ["PYTEST_DEBUG_TEMPROOT"] = _TMPFS_ROOT
+            config.add_cleanup(lambda: os.environ.pop("PYTEST_DEBUG_TEMPROOT", None))
+    except OSError:
+        pass
+
+# Custom MCP Error Codes
+class McpErrorCode(IntEnum):
+    RESOURCE_NOT_FOUND = -32010
+    IS_A_DIRECTORY = -32011
+    PERMISSION_DENIED = -32012
+    NOT_A_DIRECTORY = -32013
+    GENERIC_TOOL_ERROR = -32003 # Consistent with other tests
 
 
 # --- Helper Functions ---
@@ -68,6 +104,33 @@ async def mock_mcp_session_cm(client_to_yield: Client) -> AsyncIterator[Client]:
     yield client_to_yield
 
 
+def _reset_client_overrides(client: Client) -> None:
+    """
+    Drops per-test instance overrides (e.g. `client.call_tool = AsyncMock(...)`)
+    so a session-scoped client is back to its real methods for the next test.
+    """
+    vars(client).pop("call_tool", None)
+
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Runs the (session-scoped) test event loop on uvloop where it is available."""
+    if sys.platform != "win32":
+        try:
+            import uvloop
+            return uvloop.EventLoopPolicy()
+        except ImportError:
+            pass
+    return asyncio.DefaultEventLoopPolicy()
+
+
+# Compiled agent graphs, keyed by the identities of the tool objects they were
+# built with. Names aren't enough: tests pass differently configured tools (e.g.
+# mocks) under the same name, and each graph is bound to its own tool objects.
+# The cached graph holds those objects, so their ids stay unique while cached.
+_COMPILED_GRAPH_CACHE: dict[tuple[int, ...], "CompiledStateGraph"] = {}
+
 
 @pytest.fixture(scope="session")
 def agent_graph_fixture():
@@ -78,13 +141,18 @@ def agent_graph_fixture():
     from functools import partial
     from agent.agent_graph import planner_reason_step, tool_executor_step, build_agent_graph
 
-    def _build_agent_graph_with_tools(tools: list) -> "StateGraph":
+    def _build_agent_graph_with_tools(tools: list) -> "CompiledStateGraph":
         """
-        Builds the agent graph with a custom set of tools.
+        Builds and compiles the agent graph with a custom set of tools.
         This replaces the default planner and tool executor with instrumented versions.
         It's a bit of a hack, but it allows us to test the graph with a controlled
         set of tools without rewriting the graph construction logic.
+        Repeat calls with the same toolset return the graph that was already compiled.
         """
+        key = tuple(id(tool) for tool in tools)
+        if key in _COMPILED_GRAPH_CACHE:
+            return _COMPILED_GRAPH_CACHE[key]
+
         # Use functools.partial to create new functions with the 'tools_for_test'
         # argument already filled in. This is the modern way to configure nodes
         # without modifying them after they've been added to the graph.
@@ -96,18 +164,39 @@ def agent_graph_fixture():
         graph = build_agent_graph()
         graph.nodes['planner'] = mock_planner
         graph.nodes['tool_executor'] = mock_executor
-        return graph
+        compiled_graph = graph.compile()
+        _COMPILED_GRAPH_CACHE[key] = compiled_graph
+        return compiled_graph
 
     return _build_agent_graph_with_tools
 
 
-@pytest.fixture
-def fix_cycle_tracker():
-    """Provides a default FixCycleTracker instance for tests."""
+@pytest.fixture(scope="session")
+def settings():
+    """
+    The process-wide Settings instance (the one common.config.settings and
+    get_settings() both return). Tests override fields on it with
+    monkeypatch.setattr, which restores them afterwards, rather than clearing
+    the get_settings cache and re-reading the environment.
+    """
+    from common.config import get_settings
+    return get_settings()
+
+
+@pytest.fixture(scope="session")
+def _fix_cycle_tracker_singleton():
+    """Creates the FixCycleTracker shared by every test in the session."""
     from agent.executor.fix_cycle import FixCycleTracker
     return FixCycleTracker()
 
 
+@pytest.fixture
+def fix_cycle_tracker(_fix_cycle_tracker_singleton):
+    """Provides a FixCycleTracker in its default state for tests."""
+    _fix_cycle_tracker_singleton.reset()
+    return _fix_cycle_tracker_singleton
+
+
 # --- Pydantic Schemas for Tool Outputs ---
 
 class _ShellRunOutput(BaseModel):
@@ -120,173 +209,269 @@ class _DirEntry(BaseModel):
     type: str  # "file" or "directory"
 
 
-# --- Pytest Plugins --- 
+# --- Synchronous File I/O Helpers ---
 
-# This was moved from tests/integration/conftest.py to fix a pytest collection error.
-# It ensures that integration-specific fixtures are loaded correctly.
-pytest_plugins = ["tests.integration.pytest_plugins"]
+# Parent directories fs.write has already created during the current test.
+# Cleared in the teardown of the client fixtures that expose fs.write.
+_ENSURED_PARENTS: set[str] = set()
 
-# --- FastMCP Server for File I/O Tools ---
 
-def build_file_io_tools_server() -> FastMCP:
-    server = FastMCP("FileToolsTestServer")
+def _write_file(path: str, content: str) -> None:
+    """Creates the parent directory (once per test) and writes content in one call."""
+    target_path = Path(path)
+    parent = os.fspath(target_path.parent)
+    if parent not in _ENSURED_PARENTS:
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        _ENSURED_PARENTS.add(parent)
+    try:
+        target_path.write_bytes(content.encode('utf-8'))
+    except FileNotFoundError:
+        # The parent was removed after we created it (e.g. by the test itself).
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        target_path.write_bytes(content.encode('utf-8'))
+
+
+# --- npm ---
+
+# Flags for the npm installs the fixtures run. --prefer-offline serves packages
+# from the local npm cache (~/.npm) without revalidating their metadata, so the
+# cache warmed by earlier runs (or the first template of this one) is reused;
+# the audit and funding requests are network round-trips the tests never read.
+NPM_INSTALL_FLAGS = ("--prefer-offline", "--no-audit", "--no-fund")
+
+
+# --- git ---
+
+def git_init_and_commit(repo_path: Path, message: str) -> None:
+    """Initializes a git repository and commits its current state so `git apply` works."""
+    # One shell runs all three git commands; the message is passed as $1 so it
+    # needs no quoting. The committer identity is set inline, so machines
+    # without a global one work too.
+    subprocess.run(
+        [
+            "sh", "-c",
+            'git init -q --template= && git add . && git -c user.name="Test User" -c user.email=test@example.com commit -q -m "$1"',
+            "sh", message,
+        ],
+        cwd=repo_path,
+        check=True,
+        capture_output=True,
+    )
 
-    @server.tool(name="fs.read")
-    async def actual_fs_read(path: str) -> str:
-        try:
-            # Use asyncio.to_thread to run synchronous file I/O in a separate thread
-            content = await asyncio.to_thread(Path(path).read_text, encoding='utf-8')
-            return content
-        except FileNotFoundError:
-            raise McpError(ErrorData(code=RESOURCE_NOT_FOUND_CODE, message=f"File not found: {path}"))
-        except Exception as e:
-            raise McpError(ErrorData(code=GENERIC_TOOL_ERROR_CODE, message=f"Error reading file {path}: {str(e)}"))
-
-    @server.tool(name="fs.write")
-    async def actual_fs_write(path: str, content: str) -> None:
-        try:
-            target_path = Path(path)
-            # Ensure parent directory exists
-            await asyncio.to_thread(target_path.parent.mkdir, parents=True, exist_ok=True)
-            await asyncio.to_thread(target_path.write_text, content, encoding='utf-8')
-            return None  # MCP fs.write usually returns no content on success
-        except IsADirectoryError as e:
-            raise McpError(ErrorData(code=IS_A_DIRECTORY_ERROR_CODE, message=f"Error writing file {path}: {str(e)}"))
-        except Exception as e:
-            raise McpError(ErrorData(code=GENERIC_TOOL_ERROR_CODE, message=f"Error writing file {path}: {str(e)}"))
-
-    @server.tool(name="fs.list_dir")
-    async def actual_fs_list_dir(path: str) -> List[_DirEntry]:
-        try:
-            dir_path = Path(path)
-            if not await asyncio.to_thread(dir_path.exists):
-                raise McpError(ErrorData(code=RESOURCE_NOT_FOUND_CODE, message=f"Directory not found: {path}"))
-            if not await asyncio.to_thread(dir_path.is_dir):
-                raise McpError(ErrorData(code=NOT_A_DIRECTORY_CODE, message=f"Path is not a directory: {path}"))
-
-            entries = []
-            # Path.iterdir() is synchronous, so wrap it
-            for item in await asyncio.to_thread(list, dir_path.iterdir()): # list() to exhaust iterator in thread
-                item_type = "directory" if await asyncio.to_thread(item.is_dir) else "file"
-                entries.append(_DirEntry(name=item.name, type=item_type))
-            return entries
-        except PermissionError as e:
-            raise McpError(ErrorData(code=PERMISSION_DENIED_CODE, message=f"Permission denied: {path}"))
-        except McpError: # Re-raise McpErrors directly
-            raise
-        except Exception as e:
-            raise McpError(ErrorData(code=GENERIC_TOOL_ERROR_CODE, message=f"Error listing directory {path}: {str(e)}"))
 
-    return server
+# --- Shared Tool Implementations ---
+
+# Default cap on how much of each output stream shell.run keeps.
+DEFAULT_MAX_OUTPUT_BYTES = 1 << 20
+_TRUNCATED_MARKER = "[...truncated]"
 
-# --- Pytest Fixture for the File I/O Client ---
 
-@pytest_asyncio.fixture
-async def file_io_client() -> AsyncIterator[Client]:
-    server = build_file_io_tools_server()
-    async with Client(server) as c:
-        yield c
+async def _feed_stdin(proc: asyncio.subprocess.Process, stdin: Optional[str]) -> None:
+    """Writes stdin to the process and closes the pipe, ignoring a process that stopped reading."""
+    try:
+        if stdin:
+            proc.stdin.write(stdin.encode())
+            await proc.stdin.drain()
+        proc.stdin.close()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
 
 
-# --- FastMCP Server for Patch Tools ---
+async def _read_capped(stream: asyncio.StreamReader, max_bytes: int) -> tuple[bytes, bool]:
+    """
+    Reads a stream to EOF, keeping at most max_bytes of it.
+    The rest is read and dropped so the process never blocks on a full pipe.
+    Returns the kept bytes and whether anything was dropped.
+    """
+    chunks: List[bytes] = []
+    kept = 0
+    truncated = False
+    while chunk := await stream.read(64 * 1024):
+        room = max_bytes - kept
+        if len(chunk) > room:
+            truncated = True
+            chunk = chunk[:room]
+        if chunk:
+            chunks.append(chunk)
+            kept += len(chunk)
+    return b"".join(chunks), truncated
+
+def _decode_output(output_bytes: bytes, truncated: bool) -> str:
+    """Strips and decodes one output stream, marking it if it was cut off."""
+    if not truncated:
+        return output_bytes.strip().decode() if output_bytes else ""
+    # The cap may have split a multi-byte character, so drop any partial tail.
+    return f"{output_bytes.strip().decode(errors='ignore')}\n{_TRUNCATED_MARKER}"
+
+
+async def _shell_run(
+    command: str,
+    cwd: Optional[str] = None,
+    stdin: Optional[str] = None,
+    json: bool = False,
+    max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+):
+    """shell.run implementation registered on the test tools server."""
+    try:
+        proc = await asyncio.create_subprocess_shell(
+            command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd
+        )
+        # Like communicate(), but noisy commands can't grow the buffers past the cap.
+        _, (stdout_bytes, stdout_truncated), (stderr_bytes, stderr_truncated) = await asyncio.gather(
+            _feed_stdin(proc, stdin),
+            _read_capped(proc.stdout, max_output_bytes),
+            _read_capped(proc.stderr, max_output_bytes),
+        )
+        await proc.wait()
+
+        stdout = _decode_output(stdout_bytes, stdout_truncated)
+        stderr = _decode_output(stderr_bytes, stderr_truncated)
+        return_code = proc.returncode if proc.returncode is not None else -1
+
+        # stdout/stderr are already str and return_code an int, so skip validation.
+        result_obj = _ShellRunOutput.model_construct(stdout=stdout, stderr=stderr, return_code=return_code)
+        if json:
+            # Serialize straight to JSON text rather than building an intermediate dict.
+            return result_obj.model_dump_json()
+        return result_obj
+    except Exception as e:
+        return _ShellRunOutput(
+            stdout="",
+            stderr=f"Error in actual_shell_run: {str(e)}",
+            return_code=-1
+        )
 
-def build_patch_tools_server() -> FastMCP:
-    """Builds a FastMCP server with the tools needed for apply_patch."""
-    server = FastMCP("PatchToolsTestServer")
 
-    # --- Tool Implementations (reused from other builders for consistency) ---
+async def actual_fs_read(path: str) -> str:
+    try:
+        # Test files are tiny, so a direct read beats a worker-thread round trip.
+        return Path(path).read_bytes().decode('utf-8')
+    except FileNotFoundError:
+        raise McpError(ErrorData(code=McpErrorCode.RESOURCE_NOT_FOUND, message=f"File not found: {path}"))
+    except Exception as e:
+        raise McpError(ErrorData(code=McpErrorCode.GENERIC_TOOL_ERROR, message=f"Error reading file {path}: {str(e)}"))
 
-    @server.tool(name="fs.write")
-    async def actual_fs_write(path: str, content: str) -> None:
-        try:
-            target_path = Path(path)
-            await asyncio.to_thread(target_path.parent.mkdir, parents=True, exist_ok=True)
-            await asyncio.to_thread(target_path.write_text, content, encoding='utf-8')
-            return None
-        except IsADirectoryError as e:
-            raise McpError(ErrorData(code=IS_A_DIRECTORY_ERROR_CODE, message=f"Error writing file {path}: {str(e)}"))
-        except Exception as e:
-            raise McpError(ErrorData(code=GENERIC_TOOL_ERROR_CODE, message=f"Error writing file {path}: {str(e)}"))
-
-    @server.tool(name="fs.remove")
-    async def actual_fs_remove(path: str) -> None:
-        try:
-            await asyncio.to_thread(Path(path).unlink)
-            return None
-        except FileNotFoundError:
-            # This is not a critical error for cleanup, but we raise for testability
-            raise McpError(ErrorData(code=RESOURCE_NOT_FOUND_CODE, message=f"File not found for removal: {path}"))
-        except Exception as e:
-            raise McpError(ErrorData(code=GENERIC_TOOL_ERROR_CODE, message=f"Error removing file {path}: {str(e)}"))
-
-    @server.tool(name="shell.run")
-    async def actual_shell_run(command: str, cwd: Optional[str] = None, stdin: Optional[str] = None, json: bool = False):
-        try:
-            proc = await asyncio.create_subprocess_shell(
-                command,
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd
-            )
-            stdout_bytes, stderr_bytes = await proc.communicate(input=stdin.encode() if stdin else None)
-
-            stdout = stdout_bytes.decode().strip() if stdout_bytes else ""
-            stderr = stderr_bytes.decode().strip() if stderr_bytes else ""
-            return_code = proc.returncode if proc.returncode is not None else -1
-
-            result_obj = _ShellRunOutput(stdout=stdout, stderr=stderr, return_code=return_code)
-            if json:
-                return result_obj.model_dump()
-            return result_obj
-        except Exception as e:
-            return _ShellRunOutput(
-                stdout="",
-                stderr=f"Error in actual_shell_run: {str(e)}",
-                return_code=-1
-            )
+
+async def actual_fs_write(path: str, content: str) -> None:
+    try:
+        # Ensure parent directory exists and write, directly on the loop
+        _write_file(path, content)
+        return None  # MCP fs.write usually returns no content on success
+    except IsADirectoryError as e:
+        raise McpError(ErrorData(code=McpErrorCode.IS_A_DIRECTORY, message=f"Error writing file {path}: {str(e)}"))
+    except Exception as e:
+        raise McpError(ErrorData(code=McpErrorCode.GENERIC_TOOL_ERROR, message=f"Error writing file {path}: {str(e)}"))
+
+
+def _list_dir(path: str) -> List[_DirEntry]:
+    """Synchronous directory walk, run in a single worker thread by fs.list_dir."""
+    # os.scandir's DirEntry caches the file type from readdir, so is_dir()
+    # usually needs no extra stat call per entry.
+    try:
+        with os.scandir(path) as it:
+            # DirEntry.name is always a str and type one of two literals, so skip validation.
+            return [
+                _DirEntry.model_construct(name=entry.name, type="directory" if entry.is_dir() else "file")
+                for entry in it
+            ]
+    except FileNotFoundError:
+        raise McpError(ErrorData(code=McpErrorCode.RESOURCE_NOT_FOUND, message=f"Directory not found: {path}"))
+    except NotADirectoryError:
+        raise McpError(ErrorData(code=McpErrorCode.NOT_A_DIRECTORY, message=f"Path is not a directory: {path}"))
+
+
+async def actual_fs_list_dir(path: str) -> List[_DirEntry]:
+    try:
+        # One thread hop for the whole listing instead of one per stat call.
+        return await asyncio.to_thread(_list_dir, path)
+    except PermissionError as e:
+        raise McpError(ErrorData(code=McpErrorCode.PERMISSION_DENIED, message=f"Permission denied: {path}"))
+    except McpError: # Re-raise McpErrors directly
+        raise
+    except Exception as e:
+        raise McpError(ErrorData(code=McpErrorCode.GENERIC_TOOL_ERROR, message=f"Error listing directory {path}: {str(e)}"))
+
+
+async def actual_fs_remove(path: str) -> None:
+    try:
+        await asyncio.to_thread(Path(path).unlink)
+        return None
+    except FileNotFoundError:
+        # This is not a critical error for cleanup, but we raise for testability
+        raise McpError(ErrorData(code=McpErrorCode.RESOURCE_NOT_FOUND, message=f"File not found for removal: {path}"))
+    except Exception as e:
+        raise McpError(ErrorData(code=McpErrorCode.GENERIC_TOOL_ERROR, message=f"Error removing file {path}: {str(e)}"))
+
+
+# --- FastMCP Server for All Test Tools ---
+
+@lru_cache(maxsize=1)
+def build_test_tools_server() -> FastMCP:
+    """Builds one FastMCP server that registers every tool the client fixtures need."""
+    server = FastMCP("TestToolsServer")
+
+    server.tool(name="fs.read")(actual_fs_read)
+    server.tool(name="fs.write")(actual_fs_write)
+    server.tool(name="fs.list_dir")(actual_fs_list_dir)
+    server.tool(name="fs.remove")(actual_fs_remove)
+    server.tool(name="shell.run")(_shell_run)
 
     return server
 
-# --- Pytest Fixture for the Shell Client ---
+# --- Pytest Fixtures for the Shared Server and Clients ---
 
-@pytest_asyncio.fixture
-async def shell_client() -> AsyncIterator[Client]:
-    """Yields a FastMCP Client connected to a server with a shell.run tool using _ShellRunOutput schema."""
-    server = FastMCP("ShellToolsTestServer")
+class MCPHost:
+    """Owns the shared test tools server and the one Client connected to it."""
 
-    @server.tool(name="shell.run")
-    async def actual_shell_run(command: str, cwd: Optional[str] = None, stdin: Optional[str] = None, json: bool = False):
-        try:
-            proc = await asyncio.create_subprocess_shell(
-                command,
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=cwd
-            )
-            stdout_bytes, stderr_bytes = await proc.communicate(input=stdin.encode() if stdin else None)
-            stdout = stdout_bytes.decode().strip() if stdout_bytes else ""
-            stderr = stderr_bytes.decode().strip() if stderr_bytes else ""
-            return_code = proc.returncode if proc.returncode is not None else -1
-            result_obj = _ShellRunOutput(stdout=stdout, stderr=stderr, return_code=return_code)
-            if json:
-                return result_obj.model_dump()
-            return result_obj
-        except Exception as e:
-            return _ShellRunOutput(
-                stdout="",
-                stderr=f"Error in actual_shell_run: {str(e)}",
-                return_code=-1
-            )
-    async with Client(server) as c:
-        yield c
-
-# --- Pytest Fixture for the Patch Client ---
-
-@pytest_asyncio.fixture
-async def patch_client() -> AsyncIterator[Client]:
-    server = build_patch_tools_server()
-    async with Client(server) as c:
-        yield c
+    def __init__(self, server: FastMCP):
+        self.server = server
+        self.client = Client(server)
+        self._exit_stack = AsyncExitStack()
+
+    async def __aenter__(self) -> "MCPHost":
+        await self._exit_stack.enter_async_context(self.client)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._exit_stack.aclose()
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def mcp_host() -> AsyncIterator[MCPHost]:
+    """Builds the test tools server once and keeps its Client open for the whole session."""
+    # Pay the loop's one-time subprocess setup here rather than in the first test
+    # that calls shell.run.
+    proc = await asyncio.create_subprocess_exec(
+        "true", stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    await proc.wait()
 
+    async with MCPHost(build_test_tools_server()) as host:
+        yield host
+
+
+@pytest.fixture
+def file_io_client(mcp_host: MCPHost) -> Iterator[Client]:
+    """Yields the shared Client for the fs.read/fs.write/fs.list_dir tools."""
+    yield mcp_host.client
+    _reset_client_overrides(mcp_host.client)
+    _ENSURED_PARENTS.clear()
+
+
+@pytest.fixture
+def shell_client(mcp_host: MCPHost) -> Iterator[Client]:
+    """Yields the shared Client for the shell.run tool, which uses the _ShellRunOutput schema."""
+    yield mcp_host.client
+    _reset_client_overrides(mcp_host.client)
+
+
+@pytest.fixture
+def patch_client(mcp_host: MCPHost) -> Iterator[Client]:
+    """Yields the shared Client for the tools apply_patch needs (fs.write, fs.remove, shell.run)."""
+    yield mcp_host.client
+    _reset_client_overrides(mcp_host.client)
+    _ENSURED_PARENTS.clear()
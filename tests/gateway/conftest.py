@@ -0,0 +1,32 @@
+# tests/gateway/conftest.py
+
+from typing import Iterator
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from gateway.main import app, get_agent_graph
+
+
+@pytest.fixture(scope="session")
+def compiled_graph() -> MagicMock:
+    """
+    Stands in for the compiled agent graph for the whole session, so the
+    gateway tests never compile the real one.
+    """
+    return MagicMock()
+
+
+@pytest.fixture(scope="session")
+def client(compiled_graph: MagicMock) -> Iterator[TestClient]:
+    """
+    Provides one TestClient for every gateway test, with the agent graph
+    dependency pointed at `compiled_graph` so no test compiles the real one.
+
+    The client is not entered as a context manager, so (as before) the app's
+    lifespan does not run and REPO_DIR is left untouched.
+    """
+    app.dependency_overrides[get_agent_graph] = lambda: compiled_graph
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_agent_graph, None)
@@ -2,12 +2,16 @@
 import logging
 import asyncio
 import os
-import threading
+from contextlib import ExitStack, asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, Callable
+from unittest.mock import patch
 import re
+import shlex
 
 import pytest
-import uvicorn
+import pytest_asyncio
+from fastmcp import Client
 from mcp.server.fastmcp.server import FastMCP
 from mcp.shared.exceptions import McpError, ErrorData
 
@@ -16,68 +20,122 @@ from mcp.shared.exceptions import McpError, ErrorData
 # to make the tests hermetic and avoid dependency issues.
 mcp_server = FastMCP(name="Test-MCP-Server")
 
+# Base directory the mock tools resolve paths against. It is read from the
+# environment once here and again when mcp_server_fixture starts, instead of
+# on every tool call.
+_REPO_DIR = Path(os.environ.get("REPO_DIR", "."))
+
 
 @mcp_server.tool(name="fs.read")
 def fs_read(path: str, cwd: str | None = None) -> str:
     """Mock tool to read a file's content."""
-    repo_dir = Path(os.environ.get("REPO_DIR", "."))
     # The agent provides paths relative to the repo root.
-    full_path = repo_dir / path
-    return full_path.read_text()
+    full_path = _REPO_DIR / path
+    # Read raw bytes and decode once as UTF-8, rather than going through a text-mode file.
+    return full_path.read_bytes().decode('utf-8')
 
 
 @mcp_server.tool(name="fs.write")
 def fs_write(path: str, content: str, cwd: str | None = None) -> None:
     """Mock tool to write content to a file."""
-    repo_dir = Path(os.environ.get("REPO_DIR", "."))
     # The agent provides paths relative to the repo root.
-    full_path = repo_dir / path
+    full_path = _REPO_DIR / path
     full_path.parent.mkdir(parents=True, exist_ok=True)
-    full_path.write_text(content)
+    full_path.write_bytes(content.encode('utf-8'))
 
 
 @mcp_server.tool(name="fs.remove")
 def fs_remove(path: str, cwd: str | None = None) -> None:
     """Mock tool to remove a file."""
-    repo_dir = Path(os.environ.get("REPO_DIR", "."))
-    full_path = repo_dir / path
+    full_path = _REPO_DIR / path
     if full_path.exists() and full_path.is_file():
         full_path.unlink()
 
 
+# Anything a plain argv can't express (pipes, redirects, chaining, expansion,
+# globbing, comments, leading VAR=value assignments) needs a real shell.
+_SHELL_SYNTAX = re.compile(r"[|&;<>()$`*?\[\]{}~#\n]|^\s*\w+=")
+
+
+async def _spawn(command: str, **kwargs) -> asyncio.subprocess.Process:
+    """
+    Runs simple commands directly with create_subprocess_exec, saving the
+    intermediate /bin/sh process, and everything else through the shell.
+    """
+    if not _SHELL_SYNTAX.search(command):
+        try:
+            argv = shlex.split(command)
+        except ValueError:  # e.g. unbalanced quotes; let the shell report it
+            argv = []
+        if argv:
+            try:
+                return await asyncio.create_subprocess_exec(*argv, **kwargs)
+            except OSError:
+                # Not directly executable (e.g. a shell builtin like `cd`, or a
+                # script without the exec bit); the shell decides what it means.
+                pass
+    return await asyncio.create_subprocess_shell(command, **kwargs)
+
+
+_READ_CHUNK_SIZE = 1 << 16
+
+
+async def _drain(stream: asyncio.StreamReader) -> bytearray:
+    """
+    Reads a subprocess pipe to EOF in fixed-size chunks into one growing buffer,
+    so large outputs (e.g. `npm install` logs) are decoded straight from it once.
+    """
+    out = bytearray()
+    while chunk := await stream.read(_READ_CHUNK_SIZE):
+        out.extend(chunk)
+    return out
+
+
+def _mock_create_next_app(match: re.Match, cwd: Path) -> dict:
+    """Stands in for create-next-app by writing the minimal project the agent looks for next."""
+    # The app name from the command, e.g., "my-app"
+    app_name = match.group(1) or "my-app"
+
+    app_dir = cwd / app_name
+    app_dir.mkdir(exist_ok=True)
+    (app_dir / "package.json").write_text('{\n  "name": "my-app",\n  "version": "0.1.0",\n  "scripts": {\n    "dev": "next dev",\n    "build": "next build",\n    "start": "next start",\n    "lint": "next lint"\n  }\n}')
+
+    # Create the minimal file structure the agent will look for next
+    src_app_dir = app_dir / "src" / "app"
+    src_app_dir.mkdir(parents=True, exist_ok=True)
+    (src_app_dir / "page.tsx").write_text(
+        "export default function Home() { return <h1>My App</h1>; }"
+    )
+
+    return {
+        "stdout": f"Successfully created Next.js app '{app_name}'",
+        "stderr": "",
+        "return_code": 0,
+    }
+
+
+# Commands answered in-process instead of spawning a real (and slow) subprocess,
+# as (pattern, handler) pairs tried in order. A handler gets the match and the
+# resolved cwd and returns the shell.run result. Anything unmatched runs for real.
+_SHELL_MOCKS: list[tuple[re.Pattern, Callable[[re.Match, Path], dict]]] = [
+    (re.compile(r"create-next-app(?:@latest)?(?:\s+([^\s]+))?"), _mock_create_next_app),
+]
+
+
 @mcp_server.tool(name="shell.run")
 async def shell_run(command: str, cwd: str | None = None, stdin: str | None = None) -> dict:
     """Mock tool to run a shell command."""
-    repo_dir = Path(os.environ.get("REPO_DIR", "."))
-    # The `cwd` passed by the agent is relative to the repo_dir
-    absolute_cwd = repo_dir / cwd if cwd and cwd != "." else repo_dir
+    # The `cwd` passed by the agent is relative to the repo dir
+    absolute_cwd = _REPO_DIR / cwd if cwd and cwd != "." else _REPO_DIR
 
     # Ensure the directory exists
     absolute_cwd.mkdir(parents=True, exist_ok=True)
 
-    # --- Special Handling for create-next-app in smoke tests ---
-    if "create-next-app" in command:
-        # Extract the app name from the command, e.g., "my-app"
-        match = re.search(r"create-next-app(?:@latest)?\s+([^\s]+)", command)
-        app_name = match.group(1) if match else "my-app"
-        
-        app_dir = absolute_cwd / app_name
-        app_dir.mkdir(exist_ok=True)
-        (app_dir / "package.json").write_text('{\n  "name": "my-app",\n  "version": "0.1.0",\n  "scripts": {\n    "dev": "next dev",\n    "build": "next build",\n    "start": "next start",\n    "lint": "next lint"\n  }\n}')
-
-        # Create the minimal file structure the agent will look for next
-        src_app_dir = app_dir / "src" / "app"
-        src_app_dir.mkdir(parents=True, exist_ok=True)
-        (src_app_dir / "page.tsx").write_text(
-            "export default function Home() { return <h1>My App</h1>; }"
-        )
-        
-        return {
-            "stdout": f"Successfully created Next.js app '{app_name}'",
-            "stderr": "",
-            "return_code": 0,
-        }
-
+    # Commands with a canned in-process response never reach a subprocess.
+    for pattern, respond in _SHELL_MOCKS:
+        match = pattern.search(command)
+        if match:
+            return respond(match, absolute_cwd)
 
     try:
         # Create a mutable copy of the environment to modify the PATH
@@ -96,20 +154,25 @@ async def shell_run(command: str, cwd: str | None = None, stdin: str | None = No
         venv_bin_path = absolute_cwd / ".venv" / "bin"
         if venv_bin_path.is_dir():
             paths_to_add.append(str(venv_bin_path))
-        
+
         if paths_to_add:
             current_path = env.get("PATH", "")
             # Prepend local paths to prioritize them
             env["PATH"] = os.pathsep.join(paths_to_add) + os.pathsep + current_path
 
-        proc = await asyncio.create_subprocess_shell(
+        proc = await _spawn(
             command,
+            stdin=asyncio.subprocess.PIPE if stdin else None,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             cwd=str(absolute_cwd),  # Must be a string
             env=env,  # Pass the modified environment
         )
-        stdout, stderr = await proc.communicate(input=stdin.encode() if stdin else None)
+        if stdin:
+            proc.stdin.write(stdin.encode())
+            proc.stdin.close()
+        stdout, stderr = await asyncio.gather(_drain(proc.stdout), _drain(proc.stderr))
+        await proc.wait()
         return {
             "stdout": stdout.decode(),
             "stderr": stderr.decode(),
@@ -123,55 +186,79 @@ async def shell_run(command: str, cwd: str | None = None, stdin: str | None = No
         }
 
 
-class UvicornTestServer(uvicorn.Server):
-    """Uvicorn server that runs in a separate thread."""
+# Every module-level name bound to open_mcp_session, so all of them are patched.
+_OPEN_MCP_SESSION_TARGETS = (
+    "common.mcp_session.open_mcp_session",
+    "tools.file_io_mcp_tools.open_mcp_session",
+    "tools.shell_mcp_tools.open_mcp_session",
+)
+
+# Placeholder URL for code that reads MCP_SERVER_URL; nothing listens on it.
+IN_MEMORY_MCP_SERVER_URL = "memory://mcp"
 
-    def __init__(self, app, host='127.0.0.1', port=7800):
-        self._startup_done = threading.Event()
-        super().__init__(config=uvicorn.Config(app, host=host, port=port))
 
-    async def startup(self, sockets=None):
-        await super().startup(sockets=sockets)
-        self._startup_done.set()
+def _shared_mcp_session(client: Client):
+    """Builds a stand-in for common.mcp_session.open_mcp_session that always yields client."""
+    @asynccontextmanager
+    async def open_shared_mcp_session() -> AsyncIterator[Client]:
+        yield client
+    return open_shared_mcp_session
 
-    def run_in_thread(self):
-        self._thread = threading.Thread(target=self.run)
-        self._thread.daemon = True
-        self._thread.start()
-        self._startup_done.wait()
 
-    def stop(self):
-        self.should_exit = True
-        self._thread.join()
+# Third-party loggers that are only worth hearing from when something goes wrong.
+_NOISY_LOGGERS = ("openai", "httpx", "httpcore", "langchain", "langgraph")
 
 
 @pytest.fixture(scope="session", autouse=True)
 def configure_logging():
-    """Configure global DEBUG logging for the test session."""
-    # Set the root logger to DEBUG to capture everything
-    logging.basicConfig(level=logging.DEBUG, format="%(levelname)-8s %(name)s:%(lineno)d - %(message)s", force=True)
-    # But quiet down the noisiest third-party libraries to avoid flooding the output
-    logging.getLogger("openai").setLevel(logging.WARNING)
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("httpcore").setLevel(logging.WARNING)
-    logging.debug("Logging configured to DEBUG level for integration tests.")
+    """
+    Configure logging once for the test session.
+
+    Defaults to INFO; set PYTEST_LOG_LEVEL=DEBUG to see everything.
+    """
+    level = os.environ.get("PYTEST_LOG_LEVEL", "INFO").upper()
+    logging.basicConfig(level=level, format="%(levelname)-8s %(name)s:%(lineno)d - %(message)s", force=True)
+    # Quiet down the noisiest third-party libraries to avoid flooding the output
+    for name in _NOISY_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    logging.debug("Logging configured to %s level for integration tests.", level)
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def mcp_client() -> AsyncIterator[Client]:
+    """One in-process Client to the mock MCP server, connected once for the whole session."""
+    async with Client(mcp_server) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def compiled_agent_graph():
+    """
+    The production agent graph, compiled once for the whole session.
+
+    The LLM client is looked up when the planner runs, not when the graph is
+    compiled, so tests can still patch get_llm_client per test. No checkpointer
+    is attached, so nothing carries over between tests sharing the graph.
+    """
+    from agent.agent_graph import compile_agent_graph
+    return compile_agent_graph(checkpointer=False)
 
 
 @pytest.fixture(scope="session")
-def mcp_server_fixture(request):
-    """Starts a mock MCP server for the test session."""
-    # Use a different port to avoid conflicts with default
-    host = "127.0.0.1"
-    port = 7801 
-    os.environ["MCP_SERVER_URL"] = f"http://{host}:{port}/mcp"
+def mcp_server_fixture(request, mcp_client: Client):
+    """
+    Routes every MCP session opened during the test session to the shared
+    in-process mcp_client, with no socket, server thread or per-call handshake.
+    """
+    global _REPO_DIR
+    _REPO_DIR = Path(os.environ.get("REPO_DIR", "."))
+
+    os.environ["MCP_SERVER_URL"] = IN_MEMORY_MCP_SERVER_URL
     # Ensure the common.config.settings object reflects the test server URL as well
     from common.config import settings as _settings
     _settings.MCP_SERVER_URL = os.environ["MCP_SERVER_URL"]
 
-    app = mcp_server.streamable_http_app()
-    server = UvicornTestServer(app=app, host=host, port=port)
-    server.run_in_thread()
-
-    yield
-
-    server.stop()
+    with ExitStack() as stack:
+        for target in _OPEN_MCP_SESSION_TARGETS:
+            stack.enter_context(patch(target, _shared_mcp_session(mcp_client)))
+        yield mcp_server
@@ -1,27 +1,23 @@
 # tests/integration/test_e2e_smoke.py
 
 import logging
-import os
 import uuid
 from pathlib import Path
-from unittest.mock import MagicMock, patch
 
 import pytest
 from langchain_core.messages import HumanMessage
 
-from common.config import get_settings
 from agent.state import AgentState
 from tools.template_init import template_init
 from tools.shell_mcp_tools import run_shell
 
 
-# --- Configure Logging ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Logging is configured once per session by the integration conftest.
 logger = logging.getLogger(__name__)
 
 
 @pytest.mark.asyncio
-async def test_scaffolding_smoke_test(agent_graph_fixture, monkeypatch, tmp_path, mcp_server_fixture):
+async def test_scaffolding_smoke_test(agent_graph_fixture, monkeypatch, tmp_path, mcp_server_fixture, settings):
     """
     A smoke test to verify the agent's primary scaffolding workflow.
 
@@ -34,31 +30,23 @@ async def test_scaffolding_smoke_test(agent_graph_fixture, monkeypatch, tmp_path
     # Set the REPO_DIR to our temporary directory
     repo_dir = tmp_path / "smoke_test_repo"
     repo_dir.mkdir()
-    monkeypatch.setattr(get_settings(), 'REPO_DIR', repo_dir)
-
-    # Patch the MCP session to use the in-memory server
-    with patch('common.mcp_session.open_mcp_session') as mock_open_mcp:
-        # The patch_client fixture is session-scoped, so we can't directly
-        # use it here. Instead, we create a new client for our test server.
-        from fastmcp import Client
-        # The mcp_server_fixture sets this environment variable.
-        mcp_server_url = os.environ["MCP_SERVER_URL"]
-        client = Client(mcp_server_url.replace("/mcp", "")) # Client needs the base URL
-        mock_open_mcp.return_value.__aenter__.return_value = client
-
-        # Build the agent graph with the specific tools needed for this test.
-        # The agent_graph_fixture is a factory that we must call, and then compile the result.
-        tools = [template_init, run_shell]
-        agent_graph = agent_graph_fixture(tools=tools).compile()
-
-        # --- Run the agent ---
-        prompt = "Create a new Next.js application called my-app."
-        thread_id = f"smoke-test-{uuid.uuid4()}"
-        logger.info(f"Running agent with prompt: '{prompt}'")
-        final_state = await agent_graph.ainvoke(
-            {"messages": [HumanMessage(content=prompt)]},
-            config={"configurable": {"thread_id": thread_id}}
-        )
+    monkeypatch.setattr(settings, 'REPO_DIR', repo_dir)
+
+    # mcp_server_fixture already routes MCP sessions to the in-memory server.
+
+    # Build the agent graph with the specific tools needed for this test.
+    # The agent_graph_fixture is a factory that returns the compiled graph.
+    tools = [template_init, run_shell]
+    agent_graph = agent_graph_fixture(tools=tools)
+
+    # --- Run the agent ---
+    prompt = "Create a new Next.js application called my-app."
+    thread_id = f"smoke-test-{uuid.uuid4()}"
+    logger.info(f"Running agent with prompt: '{prompt}'")
+    final_state = await agent_graph.ainvoke(
+        {"messages": [HumanMessage(content=prompt)]},
+        config={"configurable": {"thread_id": thread_id}}
+    )
 
     # --- Assertions ---
     logger.info("--- Verifying Assertions ---")
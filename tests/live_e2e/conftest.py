@@ -94,7 +94,7 @@ async def actual_fs_write(path: str, content: str) -> None:
         target_path = Path(path)
         target_path.parent.mkdir(parents=True, exist_ok=True)
         target_path.write_text(content, encoding='utf-8')
-        logger.info(f"fs.write succeeded for path: {target_path.resolve()}")
+        logger.info("fs.write succeeded for path: %s", os.path.abspath(target_path))
     except Exception as e:
         logger.error(f"fs.write FAILED for path: {path}: {e}")
         raise  # Re-raise to let the agent handle the error
@@ -105,7 +105,7 @@ async def actual_fs_read(path: str) -> str:
     logger = logging.getLogger("live_e2e.fs_tool")
     try:
         content = Path(path).read_text(encoding='utf-8')
-        logger.info(f"fs.read succeeded for path: {Path(path).resolve()}")
+        logger.info("fs.read succeeded for path: %s", os.path.abspath(path))
         return content
     except Exception as e:
         logger.error(f"fs.read FAILED for path: {path}: {e}")
@@ -118,7 +118,7 @@ async def actual_fs_list_dir(path: str) -> List[_DirEntry]:
     try:
         dir_path = Path(path)
         entries = [_DirEntry(name=item.name, type="directory" if item.is_dir() else "file") for item in dir_path.iterdir()]
-        logger.info(f"fs.list_dir succeeded for path: {dir_path.resolve()}")
+        logger.info("fs.list_dir succeeded for path: %s", os.path.abspath(dir_path))
         return entries
     except Exception as e:
         logger.error(f"fs.list_dir FAILED for path: {path}: {e}")
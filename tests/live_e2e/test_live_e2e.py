@@ -5,6 +5,7 @@
 # IMPORTANT: This test will not mock ANYTHING! The point is to test the
 # full end-to-end flow with real tools, real LLM calls, everything is real.
 
+import asyncio
 from contextlib import asynccontextmanager
 from unittest.mock import patch
 from fastmcp import Client
@@ -14,15 +15,22 @@ from pathlib import Path
 
 import io
 import shutil
-import sys
 import subprocess
+import threading
+import uuid
 import json
 import os
 import re
 from langchain.schema import HumanMessage
 
+from tests.conftest import NPM_INSTALL_FLAGS
+
 logger = logging.getLogger(__name__)
 
+# Budget for the agent run itself; the rest of the test's 1200s hard timeout is
+# left for the final `npm run build` verification.
+AGENT_RUN_TIMEOUT_S = 900
+
 def slugify(text):
     # A simple slugify function to convert prompt to a valid directory name
     text = text.lower()
@@ -30,6 +38,48 @@ def slugify(text):
     return text
 
 
+def _discard_in_background(path: Path) -> None:
+    """
+    Renames path to a hidden sibling (O(1) on the same filesystem) and deletes
+    that in a background thread, so the test doesn't wait on removing a previous
+    run's workspace, node_modules and all. The thread is not a daemon, so the
+    interpreter finishes the removal before exiting instead of leaving the
+    trash directory behind.
+    """
+    trash = path.parent / f".trash-{uuid.uuid4()}"
+    os.rename(path, trash)
+    threading.Thread(target=shutil.rmtree, args=(trash,), kwargs={"ignore_errors": True}).start()
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Hardlinks src to dst when both are on the same filesystem, else copies it."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+@pytest.fixture(scope="session")
+def nextjs_template_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """
+    Copies the Next.js base template once per session and installs its
+    dependencies, so each test starts from a ready project instead of paying
+    for the download and `npm ci` itself.
+    """
+    template_dir = Path(__file__).parent.parent.parent / "templates" / "nextjs-base"
+    if not template_dir.is_dir():
+        pytest.fail(f"Base template not found at {template_dir}. Please run 'npx create-next-app' to create it.")
+
+    installed_dir = tmp_path_factory.mktemp("nextjs_template") / "nextjs-base"
+    shutil.copytree(template_dir, installed_dir)
+    logger.info(f"Running 'npm ci' in session template directory: {installed_dir}")
+    try:
+        subprocess.run(["npm", "ci", *NPM_INSTALL_FLAGS], cwd=installed_dir, check=True, capture_output=True, text=True, timeout=600)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        pytest.fail(f"npm ci failed for the session template: {e.stderr}")
+    return installed_dir
+
+
 @pytest.fixture(scope="function")
 def live_e2e_repo_dir(tmp_path: Path) -> Path:
     """
@@ -58,7 +108,7 @@ def live_e2e_repo_dir(tmp_path: Path) -> Path:
 @pytest.mark.e2e_live
 @pytest.mark.timeout(1200)
 @pytest.mark.asyncio
-async def test_live_full_e2e(live_e2e_repo_dir: Path, prompt: str, live_mcp_client, request, monkeypatch):
+async def test_live_full_e2e(live_e2e_repo_dir: Path, nextjs_template_dir: Path, prompt: str, live_mcp_client, settings, request, monkeypatch):
     app_slug = slugify(prompt)
     """
     Tests the full, unmocked agent pipeline on a simple scaffolding and
@@ -75,22 +125,18 @@ async def test_live_full_e2e(live_e2e_repo_dir: Path, prompt: str, live_mcp_clie
     # Ensure all shell.run cwd paths resolve under this repo directory
     workspace_path = live_e2e_repo_dir / "workspace_dev"
     if workspace_path.exists():
-        shutil.rmtree(workspace_path) # Redundant given tmp_path, but safe
+        _discard_in_background(workspace_path) # Redundant given tmp_path, but not with --save-app
     workspace_path.mkdir()
 
-    # --- Pre-initialize project from template ---
-    template_dir = Path(__file__).parent.parent.parent / "templates" / "nextjs-base"
-    if not template_dir.is_dir():
-        pytest.fail(f"Base template not found at {template_dir}. Please run 'npx create-next-app' to create it.")
-    
+    # --- Pre-initialize project from the installed template ---
     project_path = workspace_path / app_slug
-    shutil.copytree(template_dir, project_path)
+    # The agent edits the sources in place, so only node_modules is hardlinked.
+    shutil.copytree(nextjs_template_dir, project_path, ignore=shutil.ignore_patterns("node_modules"))
+    shutil.copytree(nextjs_template_dir / "node_modules", project_path / "node_modules", symlinks=True, copy_function=_link_or_copy)
     logger.info(f"Copied base template to {project_path}")
 
     # Configure the settings to use our temporary workspace
-    from common import config
-    config.get_settings.cache_clear()
-    monkeypatch.setattr(config.settings, 'REPO_DIR', workspace_path)
+    monkeypatch.setattr(settings, 'REPO_DIR', workspace_path)
 
     # Build the agent graph using its default (production) tools.
     # These tools will connect to the live_mcp_server_fixture.
@@ -121,7 +167,7 @@ async def test_live_full_e2e(live_e2e_repo_dir: Path, prompt: str, live_mcp_clie
         logger.info(f"[E2E] Workspace path: {workspace_path} contents: {os.listdir(workspace_path)}")
 
         logger.info(f"Invoking agent for prompt: '{prompt}'")
-        t0 = time.time()
+        t0 = time.monotonic()
         # Create a mock context manager that yields our live client
         @asynccontextmanager
         async def mock_mcp_session_cm():
@@ -133,14 +179,23 @@ async def test_live_full_e2e(live_e2e_repo_dir: Path, prompt: str, live_mcp_clie
             try:
                 # Stream agent events for granular logging
                 logger.info("[E2E] Streaming agent events...")
-                async for event in agent_graph.astream(initial_state, config=config):
-                    for key, value in event.items():
-                        logger.info(f"[E2E] Agent event: {key} | Value: {value}")
+                # One run streams both the per-node updates (for logging) and the
+                # full state after each step, so the last "values" chunk is the
+                # final state; there is no need to invoke the agent a second time.
+                # The soft timeout cancels only the agent run, ahead of the hard
+                # per-test timeout, so the finally blocks below still log and clean up.
+                async with asyncio.timeout(AGENT_RUN_TIMEOUT_S):
+                    async for mode, chunk in agent_graph.astream(initial_state, config=config, stream_mode=["updates", "values"]):
+                        if mode == "values":
+                            final_state = chunk
+                            continue
+                        for key, value in chunk.items():
+                            logger.info(f"[E2E] Agent event: {key} | Value: {value}")
                 logger.info("[E2E] Agent event streaming complete.")
-                # Fallback: get final state if needed
-                final_state = await agent_graph.ainvoke(initial_state, config)
+            except TimeoutError:
+                pytest.fail(f"Agent run did not finish within {AGENT_RUN_TIMEOUT_S} seconds.")
             finally:
-                t1 = time.time()
+                t1 = time.monotonic()
                 logger.info(f"Agent invocation elapsed time: {t1-t0:.2f} seconds")
             
             # --- Assertions ---
@@ -187,38 +242,3 @@ async def test_live_full_e2e(live_e2e_repo_dir: Path, prompt: str, live_mcp_clie
             if messages and hasattr(messages[-1], 'content'):
                 logger.error(f"--- Final AI Message Content ---\n{messages[-1].content}\n---------------------------------")
         agent_logger.removeHandler(log_handler)
-    
-    # --- Assertions ---
-    page_tsx_path = project_path / "src" / "app" / "page.tsx"
-
-    assert project_path.is_dir(), f"Project directory '{project_path}' was not created."
-    assert page_tsx_path.is_file(), f"page.tsx was not created at '{page_tsx_path}'."
-    logger.info("✅ Assertion Passed: Project directory and page.tsx exist.")
-        
-    # The page should contain some content and not be the default template.
-    page_content = page_tsx_path.read_text()
-    assert page_content.strip(), f"Page component '{page_tsx_path}' is empty."
-    assert "Welcome to Next.js!" not in page_content, "Agent did not modify the default page content."
-    logger.info("✅ Assertion Passed: Agent has modified the default page.tsx file.")
-
-    package_json_path = project_path / "package.json"
-    assert package_json_path.is_file(), "package.json was not created."
-    logger.info("✅ Assertion Passed: package.json exists.")
-    package_data = json.loads(package_json_path.read_text())
-    dependencies = package_data.get("dependencies", {})
-    assert "next" in dependencies, "'next' not found in package.json dependencies"
-    assert "react" in dependencies, "'react' not found in package.json dependencies"
-    logger.info("✅ Assertion Passed: package.json dependencies are correct.")
-
-    logger.info(f"Performing final verification by running 'npm run build' in {project_path}...")
-    # We need to import the original tool to call it for verification
-    from tools.shell_mcp_tools import run_shell
-    build_result = await run_shell.ainvoke({
-        "command": "npm run build",
-        "working_directory_relative_to_repo": app_slug,
-    })
-
-    assert build_result.ok, f"Final verification failed. 'npm run build' did not pass.\nSTDOUT:\n{build_result.stdout}\nSTDERR:\n{build_result.stderr}"
-    logger.info("✅ Assertion Passed: `npm run build` completed successfully.")
-    logger.info(f"--- LIVE End-to-End Test for prompt '{prompt}' Passed Successfully! ---")
-    logger.info(f"Generated app output directory: {project_path}")
\ No newline at end of file
@@ -1,12 +1,10 @@
 import pytest
-import asyncio
-import subprocess
 from pathlib import Path
 from unittest.mock import patch, AsyncMock
 from tools.shell_mcp_tools import run_shell
 
 from tools.patch_tools import apply_patch, ApplyPatchOutput
-from tests.conftest import mock_mcp_session_cm
+from tests.conftest import git_init_and_commit, mock_mcp_session_cm
 
 # --- Test Data ---
 
@@ -31,16 +29,11 @@ def git_repo(tmp_path: Path):
     """Creates a temporary git repository for testing."""
     repo_path = tmp_path / "repo"
     repo_path.mkdir()
-    # Run git commands synchronously for setup
-    subprocess.run(["git", "init"], cwd=repo_path, check=True)
-    subprocess.run(["git", "config", "user.name", "Test User"], cwd=repo_path, check=True)
-    subprocess.run(["git", "config", "user.email", "test@example.com"], cwd=repo_path, check=True)
-    
-    # Create and commit an initial file
+    # Create an initial file
     test_file = repo_path / "test.txt"
     test_file.write_text("hello\n")
-    subprocess.run(["git", "add", "test.txt"], cwd=repo_path, check=True)
-    subprocess.run(["git", "commit", "-m", "initial commit"], cwd=repo_path, check=True)
+
+    git_init_and_commit(repo_path, "initial commit")
     
     return repo_path
 